@@ -1,4 +1,5 @@
 from collections.abc import Iterable
+import math
 import time
 
 import numpy as np
@@ -11,75 +12,85 @@ from plate import Plate, unit_vector
 # TODO: Might migrate from left-handed coords (current) to right-handed z...
 
 
+def spiral_keypoints(t: float | np.ndarray) -> np.ndarray:
+    # Animated spiral grows from 10 deep at r=0, to plate surface at r=10
+    # This spans 3 rotations over depth 10, built in one go as (... x 91 x 3)
+    # Passing an array of t broadcasts out a whole batch of frames at once
+    depth = np.arange(91)
+    depth_t = np.asarray(t)[..., None] - depth/30
+    depth_r = 10 - depth/9
+    return np.stack([
+        depth_r*np.cos(2*np.pi*depth_t),
+        depth_r*np.sin(2*np.pi*depth_t),
+        np.broadcast_to(depth, depth_t.shape),
+    ], -1)
+
+
 def spiral_scenario() -> Iterable[tuple[np.ndarray, np.ndarray, np.ndarray]]:
     # Build a discrete sampling of frame data and corresponding viewing angles
     # Rotate 1 to 179 degrees across 178//4 = 44 frames
-    for frame_i in range(0, 179, 4):
+    frame_is = np.arange(0, 179, 4)
+    spirals = spiral_keypoints((frame_is + 1) / 45)  # 4 animated rotations over the plate rotation span
+
+    for frame_i, spiral in zip(frame_is, spirals):
         # Using a "following light" setup, rotate around y-axis at r=50
         # The plate visually spins anti-clockwise relative, per bird's eye
         # Also give it a slight overhead swing to break ortho ambiguity
-        radian_angle = (frame_i + 1) * np.pi / 180
-        source = np.array([50*np.cos(radian_angle), 10*np.sin(radian_angle), -50*np.sin(radian_angle)])
+        radian_angle = (frame_i + 1) * math.pi / 180  # Scalar math skips ufunc dispatch
+        source = np.array([50*math.cos(radian_angle), 10*math.sin(radian_angle), -50*math.sin(radian_angle)])
         camera = source.copy()
 
-        # Animated spiral grows from 10 deep at r=0, to plate surface at r=10
-        # This spans 3 rotations over depth 10
-        spiral = []
-        t = (frame_i + 1) / 45  # 4 animated rotations over the plate rotation span
-        for depth in range(91):
-            depth_t = t - depth/30
-            depth_r = 10 - depth/9
-            spiral.append(np.array([depth_r*np.cos(2*np.pi*depth_t), depth_r*np.sin(2*np.pi*depth_t), depth]))
-
-        yield source, camera, np.array(spiral)
+        yield source, camera, spiral
 
 
 def full_spiral_scenario() -> Iterable[tuple[np.ndarray, np.ndarray, np.ndarray]]:
     # Spiral animates around y-axis, but now full-parallax 44^2 = 1936 angles
+    # The spiral only depends on the horizontal angle, so build those 44 frames once
+    h_is = np.arange(0, 179, 4)
+    spirals = spiral_keypoints((h_is + 1) / 45)  # 4 animated rotations over the plate rotation span
+
     for v_i in range(0, 179, 4):
-        for h_i in range(0, 179, 4):
+        for h_i, spiral in zip(h_is, spirals):
             # Using a "following light" setup, rotate around y-axis at r=50
             # Not a hemisphere, but a half cylinder
-            radian_angle = (h_i + 1) * np.pi / 180
-            source = np.array([50*np.cos(radian_angle), -50*np.cos(v_i), -50*np.sin(radian_angle)])
+            radian_angle = (h_i + 1) * math.pi / 180
+            source = np.array([50*math.cos(radian_angle), -50*math.cos(v_i), -50*math.sin(radian_angle)])
             camera = source.copy()
 
-            # Animated spiral grows from 10 deep at r=0, to plate surface at r=10
-            # This spans 3 rotations over depth 10
-            spiral = []
-            t = (h_i + 1) / 45  # 4 animated rotations over the plate rotation span
-            for depth in range(91):
-                depth_t = t - depth/30
-                depth_r = 10 - depth/9
-                spiral.append(np.array([depth_r*np.cos(2*np.pi*depth_t), depth_r*np.sin(2*np.pi*depth_t), depth]))
-
-            yield source, camera, np.array(spiral)
+            yield source, camera, spiral
 
 
 def sine_scenario() -> Iterable[tuple[np.ndarray, np.ndarray, np.ndarray]]:
     # Rotate 1 to 179 degrees across 178//4 = 44 frames
-    for frame_i in range(0, 179, 4):
+    frame_is = np.arange(0, 179, 4)
+
+    # Mark surface corners to show normal depth
+    corner_kps = np.array([
+        [-15, -15, 0],
+        [15, 15, 0],
+        [-15, 15, 0],
+        [15, -15, 0],
+    ])
+
+    # Animated sine wave, deep within the plate, built for all frames as (44 x 41 x 3)
+    # Unfortunately, the animation actually makes it hard to perceive
+    # depth, despite the super deep inset
+    i = np.arange(-20, 21)
+    t = (frame_is + 1) / 4
+    sine_y = 10*np.sin(t[:, None] - i/4)
+    sine_kps = np.stack([
+        np.broadcast_to(i*2, sine_y.shape),
+        sine_y,
+        np.full_like(sine_y, 100),
+    ], -1)
+
+    for frame_i, frame_sine_kps in zip(frame_is, sine_kps):
         # Using a "following light" setup, rotate around y-axis at r=50
-        radian_angle = (frame_i + 1) * np.pi / 180
-        source = np.array([50*np.cos(radian_angle), 10*np.sin(radian_angle), -50*np.sin(radian_angle)])
+        radian_angle = (frame_i + 1) * math.pi / 180
+        source = np.array([50*math.cos(radian_angle), 10*math.sin(radian_angle), -50*math.sin(radian_angle)])
         camera = source.copy()
 
-        # Mark surface corners to show normal depth
-        sine_kps = [
-            np.array([-15, -15, 0]),
-            np.array([15, 15, 0]),
-            np.array([-15, 15, 0]),
-            np.array([15, -15, 0]),
-        ]
-
-        # Animated sine wave, deep within the plate
-        t = (frame_i + 1) / 4
-        for i in range(-20, 21):
-            sine_kps.append(np.array([i*2, 10*np.sin(t - i/4), 100]))
-        # Unfortunately, the animation actually makes it hard to perceive
-        # depth, despite the super deep inset
-
-        yield source, camera, np.array(sine_kps)
+        yield source, camera, np.vstack([corner_kps, frame_sine_kps])
 
 
 # TODO: A complex Morlet wavelet projection with equal protrusion and depth will be so cool, and absolutely MUST be done
@@ -123,9 +134,29 @@ if __name__ == "__main__":
 
     # Simulate visualization (as matplotlib animation)
     # Points are directly projected to unnormalized viewport 
-    fig, ax = plt.subplots()
-    ims = []
-    for source, camera, _ in spiral_scenario():
+    # Materialize the perspectives once, so scenario building stays out of the decode timings
+    perspectives = list(spiral_scenario())
+
+    # Decode every perspective in one batched pass
+    start = time.time()
+    all_decoded_points = plate.decode_plate_batch(
+        np.array([source for source, _, _ in perspectives]),
+        np.array([camera for _, camera, _ in perspectives]),
+    )
+    end = time.time()
+    print(f"decoded {len(perspectives)} perspectives, took {(end - start) / len(perspectives):.8f}s each")
+
+    # Project each decoded perspective to screen space up front
+    # The plate's hardcoded bounding box, as a closed loop of corners
+    bb_corners = np.array([
+        [-20, 20, 0],
+        [20, 20, 0],
+        [20, -20, 0],
+        [-20, -20, 0],
+        [-20, 20, 0],
+    ])
+    all_frame_data = []
+    for (source, camera, _), decoded_points in zip(perspectives, all_decoded_points):
         # Compute new screen space basis, oriented up (+/-z if flat)
         # Yanked from my quantum geo x-means code a while back...
         camera_normal = unit_vector(-camera)  # Looking at 0,0,0
@@ -144,39 +175,31 @@ if __name__ == "__main__":
             screen_x = unit_vector(screen_x)
             screen_y = unit_vector(screen_y)
 
-        # Draw the plate's hardcoded bounding box to projected screen space
-        all_bb_x = [
-            np.dot([-20, 20, 0], screen_x),
-            np.dot([20, 20, 0], screen_x),
-            np.dot([20, -20, 0], screen_x),
-            np.dot([-20, -20, 0], screen_x),
-            np.dot([-20, 20, 0], screen_x),
-        ]
-        all_bb_y = [
-            np.dot([-20, 20, 0], screen_y),
-            np.dot([20, 20, 0], screen_y),
-            np.dot([20, -20, 0], screen_y),
-            np.dot([-20, -20, 0], screen_y),
-            np.dot([-20, 20, 0], screen_y),
-        ]
-        plot_data = ax.plot(all_bb_x, all_bb_y, animated=True)  # List of Line2D according to docs
-
-        # Decode a single perspective and scatterplot to screen space
-        all_x = []
-        all_y = []
-        start = time.time()
-        decoded_points = plate.decode_plate(source, camera)
-        for point in decoded_points:
-            all_x.append(np.dot(point, screen_x))
-            all_y.append(np.dot(point, screen_y))
-        plot_data.extend(ax.plot(all_x, all_y, "bo", animated=True))
-
-        ims.append(plot_data)
-        end = time.time()
-        print(f"decoded a perspective, took {end - start:.8f}s")
-
-    # Animate
-    for line in ims[0]:  # Initial frame must be explicitly drawn, not blitted
-        line.set_animated(False)
-    ani = animation.ArtistAnimation(fig, ims, interval=50, blit=True, repeat_delay=1000)
+        # Project both the bounding box and decoded points with one matmul each
+        basis = np.stack([screen_x, screen_y], 0)  # 2 x 3
+        all_frame_data.append((bb_corners @ basis.T, decoded_points @ basis.T))
+
+    # Animate by updating a single box line and scatter, rather than new artists every frame
+    # The decoded points always sit within the box, so it alone sets the view limits
+    fig, ax = plt.subplots()
+    all_bb = np.vstack([bb for bb, _ in all_frame_data])
+    ax.set_xlim(all_bb[:, 0].min() - 1, all_bb[:, 0].max() + 1)
+    ax.set_ylim(all_bb[:, 1].min() - 1, all_bb[:, 1].max() + 1)
+    bb_line, = ax.plot([], [])
+    scatter = ax.scatter([], [], c="b")
+
+    def update(frame_i: int):
+        bb, points = all_frame_data[frame_i]
+        bb_line.set_data(bb[:, 0], bb[:, 1])
+        scatter.set_offsets(points)
+        return bb_line, scatter
+
+    ani = animation.FuncAnimation(
+        fig,
+        update,
+        frames=len(all_frame_data),
+        interval=50,
+        blit=True,
+        repeat_delay=1000,
+    )
     plt.show()
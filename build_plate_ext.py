@@ -0,0 +1,48 @@
+import os
+import sys
+
+from numba.pycc import CC
+
+# Block any previously built extension, since we need the original JIT kernels
+sys.modules["plate_ext"] = None
+from plate import _decode_batch_kernel, _decode_kernel, _find_mirror_batch, _kernel_source_hash
+
+
+# Ahead-of-time compiles the plate's hot kernels into a plate_ext extension
+# Run once with `python build_plate_ext.py`, and plate.py will pick it up on import
+# This skips the seconds of first-call JIT compile, nice for the interactive visualizer
+# NOTE: AOT has no parallel target, so prange runs serially. Delete the built
+# extension to fall back to the parallel JIT kernels on big plates.
+# NOTE: Rebuild after changing any kernel, otherwise plate.py ignores the stale build
+# NOTE: numba.pycc is deprecated upstream, so this may need replacing eventually
+
+cc = CC("plate_ext")
+cc.output_dir = os.path.dirname(os.path.abspath(__file__))
+
+# Baked in as a constant, which plate.py checks against its own kernels on import
+KERNEL_SOURCE_HASH = _kernel_source_hash()
+
+
+def kernel_source_hash() -> int:
+    return KERNEL_SOURCE_HASH
+
+
+cc.export("kernel_source_hash", "i8()")(kernel_source_hash)
+
+# Signatures must match the exact dtypes/layouts Plate passes in
+cc.export(
+    "find_mirror_batch",
+    "f4[:, ::1](f8[::1], f8[::1], i4[:, ::1])",
+)(_find_mirror_batch.py_func)
+cc.export(
+    "decode_kernel",
+    "void(i4[:, ::1], f4[:, ::1], i8[::1], f8[::1], f8[::1], f8, b1[::1])",
+)(_decode_kernel.py_func)
+cc.export(
+    "decode_batch_kernel",
+    "void(i4[:, ::1], f4[:, ::1], i8[::1], f8[:, ::1], f8[:, ::1], f8, b1[:, ::1])",
+)(_decode_batch_kernel.py_func)
+
+
+if __name__ == "__main__":
+    cc.compile()
@@ -1,5 +1,11 @@
 from collections.abc import Iterable
+import hashlib
+import inspect
+import math
+import warnings
+
 import numpy as np
+from numba import njit, prange
 
 
 # Helper functions
@@ -29,8 +35,8 @@ def find_mirror_point(
     # To do this, sub the parametric form of a line into the general form of a plane
     # We can simplify knowing the input is 0 centered, then solve for the magical "t"
     line_direction = flipped_b - a
-    t_side = sum(plane_normal * line_direction)  # Gather up t/constant terms
-    value_side = -sum(plane_normal * a)  # Element-wise mul, btw
+    t_side = np.dot(plane_normal, line_direction)  # Gather up t/constant terms
+    value_side = -np.dot(plane_normal, a)
     if t_side == 0:
         raise ValueError("Zero or multiple solutions, since ab is parallel to the plane.")
     t = value_side / t_side
@@ -62,30 +68,158 @@ def bulk_angle_between(
 ) -> np.ndarray:
     # Return the angle in radians between 2 nD vectors
     # Because arctan2 doesn't work for nD
+    # NOTE: No longer on the decode hot path, which compares cosines instead
+    # Only keep for debugging or reporting actual angles
     return np.arccos(np.clip(np.dot(unit_data, unit_query), -1.0, 1.0))
 
 
-# Core classes
-class Cell:
-    def __init__(self, coords: np.ndarray):
-        # Share fields by ref, acting as a simple struct
-        self.__coords = coords  # NOTE: May consider removing in the future if unused, since coords are ints anyways
-        self.__gradients = np.empty((0, 3))
-        # May store hundreds of gradients per cell even for simple images
+# JIT kernels
+# Per-call np overhead dominates on 3-vectors, so these work on unrolled xyz scalars
+@njit(cache=True)
+def _unit3(x: float, y: float, z: float) -> tuple[float, float, float]:
+    # Same as unit_vector(), returning zeros if already 0D-like
+    mag = math.sqrt(x*x + y*y + z*z)
+    if mag == 0:
+        return 0.0, 0.0, 0.0
+    return x / mag, y / mag, z / mag
+
+
+@njit(cache=True)
+def _find_mirror3(
+    ax: float, ay: float, az: float,
+    bx: float, by: float, bz: float,
+    mx: float, my: float, mz: float,
+) -> tuple[float, float, float]:
+    # Same as find_mirror(), for source a, dest b, and mirror point m
+    uax, uay, uaz = _unit3(ax - mx, ay - my, az - mz)
+    ubx, uby, ubz = _unit3(bx - mx, by - my, bz - mz)
+    return _unit3(uax + ubx, uay + uby, uaz + ubz)
+
+
+@njit(parallel=True, fastmath=True, cache=True)
+def _find_mirror_batch(
+    source: np.ndarray,  # 3
+    camera: np.ndarray,  # 3
+    mirror_points: np.ndarray,  # n_points x 3
+) -> np.ndarray:  # n_points x 3
+    # Bulk find_mirror() for a single source/camera pair
+    # Output as float32 for gradient storage, which is well within the ~1 degree tolerance
+    out = np.empty((len(mirror_points), 3), dtype=np.float32)
+    for i in prange(len(mirror_points)):
+        out[i, 0], out[i, 1], out[i, 2] = _find_mirror3(
+            source[0], source[1], source[2],
+            camera[0], camera[1], camera[2],
+            mirror_points[i, 0], mirror_points[i, 1], mirror_points[i, 2],
+        )
+    return out
+
+
+@njit(fastmath=True, cache=True)
+def _cell_visible(
+    coords: np.ndarray,  # n_cells x 3
+    gradients: np.ndarray,  # n_gradients x 3, sorted by cell
+    offsets: np.ndarray,  # n_cells + 1, cell i owns [offsets[i], offsets[i + 1])
+    source: np.ndarray,  # 3
+    camera: np.ndarray,  # 3
+    cos_tol_sq: np.float32,
+    i: int,
+) -> bool:
+    # Checks if cell i holds a gradient within tolerance of its expected mirror
+    # Only the direction of the expected mirror matters, so rather than normalizing
+    # e, test (g.e)^2 >= cos_tol^2 * (e.e) with g.e > 0, saving a sqrt per cell
+    # This relies on cos_tol > 0, i.e. a tolerance under 90 degrees
+    # Decode is memory-bound over the float32 gradients, so accumulate in float32 too
+    if offsets[i] == offsets[i + 1]:
+        return False
+
+    ax, ay, az = _unit3(source[0] - coords[i, 0], source[1] - coords[i, 1], source[2] - coords[i, 2])
+    bx, by, bz = _unit3(camera[0] - coords[i, 0], camera[1] - coords[i, 1], camera[2] - coords[i, 2])
+    ex = np.float32(ax + bx)
+    ey = np.float32(ay + by)
+    ez = np.float32(az + bz)
+    threshold = cos_tol_sq * (ex*ex + ey*ey + ez*ez)
+
+    # Any gradient in this cell's slice of the buffer will do
+    for g in range(offsets[i], offsets[i + 1]):
+        dot = gradients[g, 0]*ex + gradients[g, 1]*ey + gradients[g, 2]*ez
+        if dot > 0 and dot*dot >= threshold:
+            return True
+    return False
+
+
+@njit(parallel=True, fastmath=True, cache=True)
+def _decode_kernel(
+    coords: np.ndarray,  # n_cells x 3
+    gradients: np.ndarray,  # n_gradients x 3, sorted by cell
+    offsets: np.ndarray,  # n_cells + 1
+    source: np.ndarray,  # 3
+    camera: np.ndarray,  # 3
+    cos_tol: float,
+    out_mask: np.ndarray,  # n_cells, written in place
+) -> None:
+    # Marks every visible cell for a single perspective
+    cos_tol_sq = np.float32(cos_tol * cos_tol)
+    for i in prange(len(coords)):
+        out_mask[i] = _cell_visible(coords, gradients, offsets, source, camera, cos_tol_sq, i)
+
+
+@njit(parallel=True, fastmath=True, cache=True)
+def _decode_batch_kernel(
+    coords: np.ndarray,  # n_cells x 3
+    gradients: np.ndarray,  # n_gradients x 3, sorted by cell
+    offsets: np.ndarray,  # n_cells + 1
+    sources: np.ndarray,  # n_frames x 3
+    cameras: np.ndarray,  # n_frames x 3
+    cos_tol: float,
+    out_mask: np.ndarray,  # n_frames x n_cells, written in place
+) -> None:
+    # Marks every visible cell for many perspectives
+    # Flattens the (frame, cell) product so prange balances well even for few frames
+    cos_tol_sq = np.float32(cos_tol * cos_tol)
+    n_cells = len(coords)
+    for fi in prange(len(sources) * n_cells):
+        f = fi // n_cells
+        i = fi % n_cells
+        out_mask[f, i] = _cell_visible(coords, gradients, offsets, sources[f], cameras[f], cos_tol_sq, i)
+
+
+def _kernel_source_hash() -> int:
+    # Fingerprints the JIT kernels' source, so a stale plate_ext build can be detected
+    # Truncated to 7 bytes so it fits a signed int64 for the AOT export
+    kernels = (_unit3, _find_mirror3, _find_mirror_batch, _cell_visible, _decode_kernel, _decode_batch_kernel)
+    source = "".join(inspect.getsource(kernel.py_func) for kernel in kernels)
+    return int.from_bytes(hashlib.sha256(source.encode()).digest()[:7], "little")
+
+
+def _load_aot_kernels() -> tuple | None:
+    # Returns the ahead-of-time compiled kernels if built, see build_plate_ext.py
+    # A build from different kernel source is stale, so warn and skip it
+    try:
+        import plate_ext  # type: ignore
+    except ImportError:
+        return None
+
+    ext_hash = getattr(plate_ext, "kernel_source_hash", None)
+    if ext_hash is None or ext_hash() != _kernel_source_hash():
+        warnings.warn(
+            "plate_ext was built from different kernels, so falling back to JIT. "
+            "Rerun build_plate_ext.py to rebuild it."
+        )
+        return None
+
+    return plate_ext.decode_batch_kernel, plate_ext.decode_kernel, plate_ext.find_mirror_batch
+
+
+# Prefer the AOT kernels if built and up to date
+# Otherwise, the JIT kernels above compile on first call (and cache to disk)
+_decode_batch_kernel, _decode_kernel, _find_mirror_batch = _load_aot_kernels() or (
+    _decode_batch_kernel,
+    _decode_kernel,
+    _find_mirror_batch,
+)
 
-    @property
-    def coords(self) -> np.ndarray:
-        return self.__coords
-    
-    @property
-    def gradients(self) -> np.ndarray:  # n_gradients x n_dims
-        return self.__gradients
-    
-    @gradients.setter
-    def gradients(self, gradients: np.ndarray) -> None:
-        self.__gradients = gradients
-    
 
+# Core classes
 class Plate:
     # Represents a collection of cells in 3D that can encode directional binary images
     # This version stores a simple rectangular grid of cells on z=0, facing 0,0,-1
@@ -109,31 +243,59 @@ class Plate:
         self.__size_x = size_x
         self.__size_y = size_y
 
-        # In Python, numpy arrays are not ideal for unvectorized iteration, so a
-        # flattened, row-major list of Cell objs is marginally more efficient.
+        # Cells are stored as a Structure-of-Arrays rather than a list of Cell objs
+        # Coords are a dense, flattened, row-major (n_cells x 3) int array
         # Almost all cells are touched in full-parallax, so store as dense.
-        self.__cells = [
-            Cell(np.array([x + start_x, y + start_y, 0]))
-            for y in range(size_y)
-            for x in range(size_x)
-        ]
-
-    def closest_cell(self, point: np.ndarray) -> Cell:
-        # Returns the Cell the point correspond to, clamping if out-of-range
+        # Cast after offsetting, since np int starts would otherwise promote past int32
+        ys, xs = np.mgrid[0:size_y, 0:size_x]
+        self.__coords = np.stack(
+            [xs + start_x, ys + start_y, np.zeros_like(xs)], -1
+        ).reshape(-1, 3).astype(np.int32, copy=False)
+
+        # Gradients of all cells live in one contiguous (n_gradients x 3) buffer
+        # Each cell owns the CSR-style slice [offsets[i], offsets[i + 1])
+        # May store hundreds of gradients per cell even for simple images
+        self.__gradients = np.empty((0, 3), dtype=np.float32)
+        self.__offsets = np.zeros(size_x * size_y + 1, dtype=np.int64)
+
+    @property
+    def coords(self) -> np.ndarray:  # n_cells x 3, row-major
+        return self.__coords
+
+    @property
+    def gradients(self) -> np.ndarray:  # n_gradients x 3, sorted by cell
+        return self.__gradients
+
+    @property
+    def offsets(self) -> np.ndarray:  # n_cells + 1
+        # Cell i owns gradients[offsets[i]:offsets[i + 1]]
+        return self.__offsets
+
+    def __kernel_arrays(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        # The AOT kernels trust exact dtypes and C-contiguity without checking, so enforce both
+        # These are no-op passthroughs unless something upstream drifted
+        return (
+            np.ascontiguousarray(self.__coords, dtype=np.int32),
+            np.ascontiguousarray(self.__gradients, dtype=np.float32),
+            np.ascontiguousarray(self.__offsets, dtype=np.int64),
+        )
+
+    def closest_cell(self, point: np.ndarray) -> int:
+        # Returns the flat index of the cell the point corresponds to, clamping if out-of-range
         # This interface might be useful for arbitrary orientation or shapes?
         adjusted_x = int(round(point[0])) - self.__start_x
         adjusted_y = int(round(point[1])) - self.__start_y
         adjusted_x = min(max(adjusted_x, 0), self.__size_x - 1)
         adjusted_y = min(max(adjusted_y, 0), self.__size_y - 1)
 
-        return self.__cells[adjusted_y * self.__size_y + adjusted_x]
+        return adjusted_y * self.__size_x + adjusted_x  # Row-major, so rows are size_x long
     
     def sightline_cell(
         self,
         camera: np.ndarray,
         keypoint: np.ndarray
-    ) -> Cell | None:
-        # Finds the cell that a keypoint's sightline corresponds to
+    ) -> int | None:
+        # Finds the flat index of the cell that a keypoint's sightline corresponds to
         # Returns None if zero or multiple solutions
 
         # Since the plate is defined flat at z=0, we can massively simplify
@@ -149,12 +311,36 @@ class Plate:
 
             # Match this arbitrary plane point to a nearby cell
             # Assumes integer cell pos and negligible internal cell structure
-            cell = self.closest_cell(raw_coords)
-            if np.linalg.norm(cell.coords - raw_coords) <= 1.415:  # Bit more than a diagonal
-                return cell
+            cell_i = self.closest_cell(raw_coords)
+            if np.linalg.norm(self.__coords[cell_i] - raw_coords) <= 1.415:  # Bit more than a diagonal
+                return cell_i
             else:
                 return None  # Out of grid bounds
 
+    def sightline_cells(
+        self,
+        camera: np.ndarray,
+        keypoints: np.ndarray,  # n_keypoints x 3
+    ) -> np.ndarray:
+        # Bulk sightline_cell(), returning flat cell indices of only the keypoints that land
+        keypoints = np.asarray(keypoints, dtype=np.float64).reshape(-1, 3)
+
+        # Parallel sightlines have no solutions, so drop them before solving for t
+        line_directions = camera - keypoints
+        keypoints = keypoints[line_directions[:, 2] != 0]
+        line_directions = line_directions[line_directions[:, 2] != 0]
+        t = -keypoints[:, 2] / line_directions[:, 2]
+        raw_coords = line_directions * t[:, None] + keypoints
+
+        # Match each plane point to a nearby cell, clamping like closest_cell()
+        adjusted_x = np.clip(np.round(raw_coords[:, 0]).astype(np.int64) - self.__start_x, 0, self.__size_x - 1)
+        adjusted_y = np.clip(np.round(raw_coords[:, 1]).astype(np.int64) - self.__start_y, 0, self.__size_y - 1)
+        cell_indices = adjusted_y * self.__size_x + adjusted_x
+
+        # Out of grid bounds if further than a bit more than a diagonal
+        on_plate = np.linalg.norm(self.__coords[cell_indices] - raw_coords, axis=1) <= 1.415
+        return cell_indices[on_plate]
+
     def encode_plate(
         self,
         encoding_data: Iterable[tuple[np.ndarray, np.ndarray, np.ndarray]],
@@ -165,46 +351,100 @@ class Plate:
         # - current point camera (3D vector)
         # - frame at this perspective (zero or more 3D vectors)
 
-        # Queue changes to build arrays only once
-        new_gradients: dict[Cell, list[np.ndarray]] = {}
+        # Queue changes as flat (cell index, gradient) pairs to build arrays only once
+        # Buffers are pre-sized and double when full, to avoid many small allocations
+        n_cells = len(self.__coords)
+        n_queued = 0
+        cell_indices = np.empty(0, dtype=np.int64)
+        new_gradients = np.empty((0, 3), dtype=np.float32)
+
+        coords, _, _ = self.__kernel_arrays()
 
         # For now, we know the plate exists on 0,0,0 with normal 0,0,-1 with integer cell pos
         # We also know that source/camera pos must be -z
         for source, camera, frame in encoding_data:
-            for keypoint in frame:
-                # Locate the plate's cell the keypoint corresponds to
-                cell = self.sightline_cell(camera, keypoint)
-
-                if cell is not None:  # Only if it lands on the plate
-                    # Compute and store the true mirror angle required
-                    if cell in new_gradients:
-                        new_gradients[cell].append(find_mirror(source, camera, cell.coords))
-                    else:
-                        new_gradients[cell] = [find_mirror(source, camera, cell.coords)]
-
-        # Resolve queued changes
-        for cell, gradients in new_gradients.items():
-            cell.gradients = np.vstack(gradients)
+            # Locate the plate's cells the keypoints correspond to
+            # Only keep those that land on the plate
+            frame_indices = self.sightline_cells(camera, frame)
+            if len(frame_indices) == 0:
+                continue
+
+            n_next = n_queued + len(frame_indices)
+            if n_next > len(cell_indices):
+                capacity = max(n_next, 2 * len(cell_indices), 1024)
+                cell_indices = np.resize(cell_indices, capacity)
+                new_gradients = np.resize(new_gradients, (capacity, 3))
+
+            # Compute and store the true mirror angles required, once per frame
+            # Inputs are made C-contiguous, since the AOT kernels assume it without checking
+            cell_indices[n_queued:n_next] = frame_indices
+            new_gradients[n_queued:n_next] = _find_mirror_batch(
+                np.ascontiguousarray(source, dtype=np.float64),
+                np.ascontiguousarray(camera, dtype=np.float64),
+                coords[frame_indices],
+            )
+            n_queued = n_next
+
+        # Resolve queued changes into one contiguous, cell-sorted buffer
+        # Cells touched by this encode have their old gradients replaced, others are kept
+        cell_indices = cell_indices[:n_queued]
+        old_cell_indices = np.repeat(np.arange(n_cells), np.diff(self.__offsets))
+        kept = ~np.isin(old_cell_indices, cell_indices)
+        cell_indices = np.concatenate([old_cell_indices[kept], cell_indices])
+        order = np.argsort(cell_indices, kind="stable")
+        self.__gradients = np.concatenate([self.__gradients[kept], new_gradients[:n_queued]])[order]
+        self.__offsets = np.concatenate([[0], np.bincount(cell_indices, minlength=n_cells).cumsum()])
 
     def decode_plate(
         self,
         source: np.ndarray,
         camera: np.ndarray,
         rad_tol: float = 0.017453,  # Roughly 1 degree
-    ) -> list[np.ndarray]:
-        # Returns all plate coords that should light up from a perspective
+    ) -> np.ndarray:
+        # Returns all plate coords that should light up from a perspective, as (n_visible x 3)
         # (the render will figure out the global to screen space placement via camera properties)
         # Subclass extensions may want to account for self-occlusion by the plate or cell engraving shape
-        visible_points = []
-
-        for cell in self.__cells:
-            # Check if this cell has suitable gradient to create a reflection
-            # If it's close enough, append coords to output
-            expected = find_mirror(source, camera, cell.coords)
-            if len(cell.gradients) > 0 and np.any(bulk_angle_between(
-                expected,
-                cell.gradients,
-            ) <= rad_tol):
-                visible_points.append(cell.coords)
-
-        return visible_points
+        if not 0 <= rad_tol < math.pi / 2:
+            raise ValueError("Angle tolerance must be within [0, pi/2) radians.")
+
+        # Check if each cell has a suitable gradient to create a reflection
+        # Since cos is decreasing over [0, pi], angle <= tol iff cos(angle) >= cos(tol)
+        # Comparing cosines skips both arccos and clip entirely
+        visible = np.empty(len(self.__coords), dtype=np.bool_)
+        _decode_kernel(
+            *self.__kernel_arrays(),
+            np.ascontiguousarray(source, dtype=np.float64),
+            np.ascontiguousarray(camera, dtype=np.float64),
+            math.cos(rad_tol),
+            visible,
+        )
+
+        return self.__coords[visible]
+
+    def decode_plate_batch(
+        self,
+        sources: np.ndarray,  # n_frames x 3
+        cameras: np.ndarray,  # n_frames x 3
+        rad_tol: float = 0.017453,  # Roughly 1 degree
+    ) -> list[np.ndarray]:
+        # Bulk decode_plate(), returning the visible coords of each perspective
+        # Decodes all frames in a single kernel call to amortize dispatch overhead
+        if not 0 <= rad_tol < math.pi / 2:
+            raise ValueError("Angle tolerance must be within [0, pi/2) radians.")
+
+        # The AOT kernels assume C-contiguous inputs and do not check, so always copy if needed
+        sources = np.ascontiguousarray(np.reshape(sources, (-1, 3)), dtype=np.float64)
+        cameras = np.ascontiguousarray(np.reshape(cameras, (-1, 3)), dtype=np.float64)
+        if len(sources) != len(cameras):
+            raise ValueError("Must provide exactly one camera per source.")
+
+        visible = np.empty((len(sources), len(self.__coords)), dtype=np.bool_)
+        _decode_batch_kernel(
+            *self.__kernel_arrays(),
+            sources,
+            cameras,
+            math.cos(rad_tol),
+            visible,
+        )
+
+        return [self.__coords[frame_visible] for frame_visible in visible]